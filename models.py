@@ -0,0 +1,34 @@
+"""
+Pydantic models for extracted contract data.
+
+Kept out of processor.py because mypyc cannot compile Pydantic model classes.
+"""
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class SoftwareContract(BaseModel):
+    software_system_name: str = Field(description="Name of product or service")
+    vendor_name_dba: str = Field(description="Company providing software or service (who is providing the servise?) (DOING BUSINESS AS)")
+    vendor_name_legal: str = Field(description="Company providing software or service (who is providing the servise legal name?) (LEGAL ENTITY) ")
+    contract_start: Optional[str] = Field(description="Contract start date (start = date of contract)", default=None)
+    contract_end: Optional[str] = Field(description="Contract end date", default=None)
+    contract_period: Optional[int] = Field(description="Contract duration (period of contract) in months", default=None)
+    auto_renewal: Optional[bool] = Field(description="Is contract renewed (prolonged) automatically?", default=None)
+    cancellation_notice_initial: Optional[int] = Field(
+        description="Number of days required to cancel the contract (INITIAL TERM)", default=None)
+    cancellation_notice_ongoing: Optional[int] = Field(
+        description="Number of days required to cancel the contract (ONGOING)", default=None)
+    payment_terms: Optional[str] = Field(description="Terms (monthly, yearly, user subscription, per licence, other)",
+                                         default=None)
+    payment_delay: Optional[int] = Field(description="Delay between invoice receiption and payment (in days)",
+                                         default=0)
+    payment_amount_setup: Optional[float] = Field(description="Payment amount, setup fee", default=None)
+    payment_amount_per_terms: Optional[float] = Field(
+        description="Payment amount per terms (per user, per month, per licence)", default=None)
+    sla_uptime_guarantee: Optional[str] = Field(description="Any included SLA/Uptime guarantee terms", default=None)
+    integration_clauses: Optional[str] = Field(description="Compatibility with DMS/CRM", default=None)
+    data_ownership: str = Field(description="Who owns stored data, assume DEALER if not specified", default="DEALER")
+    license_count: int = Field(
+        description="Number of licenses, active users, seats. If not presented assume unlimited (mark as -1)",
+        default=-1)
@@ -1,92 +1,406 @@
-from pydantic import BaseModel, Field
+import msgspec
 from google import genai
-from google.genai import types
-from typing import List, Any, Optional
+from google.genai import errors, types
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+from typing import Callable, Dict, List, Any, Optional
 import os
 import json
+import asyncio
+import hashlib
+import io
 import logging
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from pathlib import Path
-import tempfile
 from datetime import datetime
+from decimal import Decimal
+
+from models import SoftwareContract
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MODEL = "models/gemini-2.0-flash"
+
+# Bump whenever the system prompt, main prompt or schema changes so that
+# cached extractions produced by the old prompt are no longer served.
+PROMPT_VERSION = "2"
+
+# Most extracted contracts kept in memory; older ones are still served from cache_dir
+RESPONSE_CACHE_SIZE = 256
+
+# Files uploaded through the Gemini Files API are deleted after 48 hours
+UPLOADED_FILE_TTL = 47 * 3600
+
+# PDFs larger than this are uploaded through the Gemini Files API instead of
+# being base64-encoded into the request body
+INLINE_PDF_LIMIT = 4 * 1024 * 1024
+
+# Lifetime of the server-side context cache holding the system prompt and few-shot examples
+CONTEXT_CACHE_TTL = 3600
+
+# Wait this long before trying to create the context cache again after a transient failure
+CONTEXT_CACHE_RETRY_DELAY = 300
+
+# HTTP status codes of Gemini errors worth retrying: rate limiting and transient server failures
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 503, 504})
+
+
+# Interned so every extractor instance shares the same prompt strings
+SYSTEM_PROMPT = sys.intern("""
+You are an AI assistant specialized in extracting specific information from software contracts.
+Extract EXACTLY these fields from the contract. Pay close attention to the exact field names and data types.
+
+1. Software/System Name: The name of the product or service
+2. Vendor Name (DBA): Company name doing business as
+3. Vendor Name (Legal Entity): Legal entity name of the company
+4. Contract Start: Start date of the contract (format: YYYY-MM-DD)
+5. Contract End: End date of the contract (can be NULL if not specified)
+6. Contract Period: Duration in months (integer)
+7. Auto-renewal: Is the contract automatically renewed? (boolean: true/false)
+8. Cancellation Notice (Initial Term): Days required to cancel during initial term (integer)
+9. Cancellation Notice (Ongoing): Days required to cancel after initial term (integer)
+10. Payment Terms: Monthly, yearly, per user subscription, per license, or other
+11. Payment Amount Setup Fee: One-time setup fee amount (float)
+12. Payment Amount Per Terms: Recurring payment amount (float)
+13. SLA/Uptime Guarantee: Any service level agreement terms (can be NULL)
+14. Integration Clauses: Compatibility with DMS/CRM systems
+15. Data Ownership: Who owns the data (default to "DEALER" if not specified)
+16. License Count: Number of licenses/users/seats (use -1 for unlimited)
+
+IMPORTANT:
+- Use NULL for missing string values
+- Use null for missing date values
+- Use appropriate data types (string, integer, float, boolean)
+- For License Count, if unlimited or not specified, use -1
+- For Data Ownership, if not specified, default to "DEALER"
+- Extract dates in YYYY-MM-DD format
+- For payment amounts, extract numeric values only (no currency symbols)
+""")
+
+MAIN_PROMPT = sys.intern(
+    "Please extract the contract information from the attached PDF document according to the specified fields."
+)
+
+def _build_response_schema() -> types.Schema:
+    """
+    Convert the SoftwareContract JSON schema into a Gemini Schema.
+
+    Passing a Schema rather than the Pydantic class keeps the SDK from running
+    model_validate on every response; the text is decoded by decode_contract.
+    """
+    schema = SoftwareContract.model_json_schema()
+    for prop in schema["properties"].values():
+        # Optional[X] is rendered as anyOf [X, null], which Gemini expects as a nullable X
+        any_of = prop.pop("anyOf", None)
+        if any_of:
+            prop["type"] = next(option["type"] for option in any_of if option["type"] != "null")
+            prop["nullable"] = True
+    schema["property_ordering"] = list(schema["properties"])
+    return types.Schema.model_validate(schema)
+
+
+RESPONSE_SCHEMA = _build_response_schema()
+
+GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": RESPONSE_SCHEMA}
+
+
+# msgspec mirror of SoftwareContract, used to decode and type-check JSON quickly.
+# Built from the model's fields so the two can't drift apart.
+SoftwareContractMsg = msgspec.defstruct(
+    "SoftwareContractMsg",
+    [
+        (name, field.annotation) if field.is_required() else (name, field.annotation, field.default)
+        for name, field in SoftwareContract.model_fields.items()
+    ],
+    kw_only=True,
+)
+
+
+# strict=False keeps Pydantic's lax coercions, e.g. 12.0 -> 12 and "5" -> 5
+_contract_decoder = msgspec.json.Decoder(SoftwareContractMsg, strict=False)
+
+
+def decode_contract(blob) -> SoftwareContract:
+    """
+    Decode a contract from JSON produced by Gemini or the caches.
+
+    msgspec checks the field types, so the Pydantic validator chain is skipped
+    with model_construct.
+
+    Args:
+        blob: JSON document as str or bytes, or the dict the SDK already parsed it into
+
+    Returns:
+        SoftwareContract object
+    """
+    if isinstance(blob, dict):
+        contract = msgspec.convert(blob, SoftwareContractMsg, strict=False)
+    else:
+        if isinstance(blob, str):
+            blob = blob.encode()
+        contract = _contract_decoder.decode(blob)
+    return SoftwareContract.model_construct(**msgspec.structs.asdict(contract))
+
+
+def _is_retryable(exception: BaseException) -> bool:
+    """Return True for Gemini errors that are likely to succeed on retry."""
+    return isinstance(exception, errors.APIError) and exception.code in RETRYABLE_STATUS_CODES
+
+
+# Exponential backoff with jitter, for at most 4 attempts in total
+gemini_retry = retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=wait_exponential_jitter(initial=1, max=16),
+    stop=stop_after_attempt(4),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True,
+)
+
+
+# Lexical fingerprint of the semantic cache, kept at module level for mypyc.
+# Company names ("Acme Inc.", "9355-7742 Québec inc.") used as a lexical fingerprint,
+# so that two near-identical templates from different vendors never match
+SEMANTIC_VENDOR_PATTERN = re.compile(
+    r"\b([\w&.,'-]+(?:\s+[\w&.,'-]+){0,3}\s+(?:inc|llc|ltd|corp|corporation|gmbh|company|co)\b\.?)",
+    re.IGNORECASE,
+)
+
+# Dates ("2024-01-31", "01/31/2024", "31.01.2024", "January 31, 2024", "31 Jan 2024") and
+# currency amounts ("$1,200.00", "USD 1200", "1 200,00 €") are part of the fingerprint too,
+# so a renewal of the same template with different terms never matches
+SEMANTIC_DATE_PATTERN = re.compile(
+    r"\b(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/.]\d{1,2}[/.]\d{2,4}"
+    r"|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2},?\s+\d{4}"
+    r"|\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?,?\s+\d{4})\b",
+    re.IGNORECASE,
+)
+_AMOUNT = r"(\d{1,3}(?:[ ,.]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?)"
+SEMANTIC_AMOUNT_PATTERN = re.compile(
+    rf"(?:[$€£]|\b(?:usd|eur|gbp|cad)\b)\s*{_AMOUNT}|{_AMOUNT}\s*(?:[$€£]|\b(?:usd|eur|gbp|cad)\b)",
+    re.IGNORECASE,
+)
+
+# Every number, in order, so notice periods, durations, seat counts and percentages
+# written without a currency ("90 days", "36 months", "25 seats", "99.9%") count too
+SEMANTIC_NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+# Sentences stating contract terms are compared verbatim, which catches wording-only
+# changes such as "Renews automatically" vs "Does not renew"
+SEMANTIC_SENTENCE_SPLIT = re.compile(r"(?<=[.;!?])\s+|\n")
+SEMANTIC_TERM_PATTERN = re.compile(
+    r"renew|terminat|cancel|notice|uptime|availab|\bsla\b|licen[cs]e|seat|user|owner|integrat|payment|fee|invoice",
+    re.IGNORECASE,
+)
+
+
+def _parse_amount(amount: str) -> str:
+    """
+    Normalize a currency amount, so "1,200.00", "1 200,00" and "1200" compare equal
+    while "120.00" and "12000" do not.
+
+    The last '.' or ',' followed by one or two digits is the decimal separator;
+    every other separator groups thousands.
+    """
+    amount = "".join(amount.split())
+    match = re.fullmatch(r"(.*?)[.,](\d{1,2})", amount)
+    integer, fraction = (match.group(1), match.group(2)) if match else (amount, "0")
+    integer = re.sub(r"[.,]", "", integer) or "0"
+    return format(Decimal(f"{integer}.{fraction}").normalize(), "f")
+
+
+class SemanticCache:
+    """Cache of extracted contracts keyed by the embedding of their text.
+
+    Copies of a contract whose bytes differ (re-exported, re-scanned, or with
+    only customer names changed) but whose terms are identical are served from
+    the cache instead of calling Gemini again. Requires the optional
+    ``pypdf`` and ``sentence-transformers`` packages; the cache is disabled
+    if either is missing.
+    """
+
+    EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    TEXT_LIMIT = 4096
+
+    def __init__(self, threshold: float = 0.95):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a cache hit
+        """
+        self.threshold = threshold
+        self._embeddings: List[Any] = []
+        self._fingerprints: List[frozenset] = []
+        self._blobs: List[str] = []
+        self._model: Any = None
+        # Lookups run in worker threads, concurrently with each other and with add
+        self._lock = threading.Lock()
+        self.enabled = True
+
+        try:
+            import numpy  # type: ignore  # noqa: F401
+            import pypdf  # type: ignore  # noqa: F401
+            from sentence_transformers import SentenceTransformer  # type: ignore  # noqa: F401
+        except ImportError:
+            logger.warning("Semantic cache disabled: install pypdf and sentence-transformers to enable it")
+            self.enabled = False
+
+    def _extract_text(self, pdf_data: bytes) -> str:
+        """Extract the text of the whole PDF, so the fingerprint covers every page."""
+        from pypdf import PdfReader  # type: ignore
+
+        reader = PdfReader(io.BytesIO(pdf_data))
+        return "".join(page.extract_text() or "" for page in reader.pages)
+
+    def _fingerprint(self, text: str) -> frozenset:
+        vendors = {"vendor:" + match.strip().lower() for match in SEMANTIC_VENDOR_PATTERN.findall(text)}
+        dates = {
+            "date:" + " ".join(match.lower().replace(",", " ").split()) for match in SEMANTIC_DATE_PATTERN.findall(text)
+        }
+        amounts = {
+            "amount:" + _parse_amount(before or after) for before, after in SEMANTIC_AMOUNT_PATTERN.findall(text)
+        }
+        terms = {
+            "term:" + " ".join(sentence.lower().split())
+            for sentence in SEMANTIC_SENTENCE_SPLIT.split(text)
+            if SEMANTIC_TERM_PATTERN.search(sentence)
+        }
+        numbers = "numbers:" + " ".join(SEMANTIC_NUMBER_PATTERN.findall(text))
+        return frozenset(vendors | dates | amounts | terms | {numbers})
+
+    def _embed(self, text: str):
+        from sentence_transformers import SentenceTransformer  # type: ignore
+
+        with self._lock:
+            if self._model is None:
+                self._model = SentenceTransformer(self.EMBEDDING_MODEL)
+        return self._model.encode(text, normalize_embeddings=True)
+
+    def lookup(self, pdf_data: bytes) -> tuple:
+        """
+        Find a cached contract similar to the given PDF.
+
+        Args:
+            pdf_data: PDF file data as bytes
+
+        Returns:
+            Tuple of (cached SoftwareContract or None, lookup state to pass to ``add``)
+        """
+        if not self.enabled:
+            return None, None
+
+        try:
+            text = self._extract_text(pdf_data)
+        except Exception as e:
+            logger.warning(f"Could not extract PDF text for semantic cache: {str(e)}")
+            return None, None
+
+        if not text.strip():
+            return None, None
+
+        import numpy as np  # type: ignore
+
+        # Only the beginning of the document is embedded
+        embedding = self._embed(text[:self.TEXT_LIMIT])
+        fingerprint = self._fingerprint(text)
 
-class SoftwareContract(BaseModel):
-    software_system_name: str = Field(description="Name of product or service")
-    vendor_name_dba: str = Field(description="Company providing software or service (who is providing the servise?) (DOING BUSINESS AS)")
-    vendor_name_legal: str = Field(description="Company providing software or service (who is providing the servise legal name?) (LEGAL ENTITY) ")
-    contract_start: Optional[str] = Field(description="Contract start date (start = date of contract)", default=None)
-    contract_end: Optional[str] = Field(description="Contract end date", default=None)
-    contract_period: Optional[int] = Field(description="Contract duration (period of contract) in months", default=None)
-    auto_renewal: Optional[bool] = Field(description="Is contract renewed (prolonged) automatically?", default=None)
-    cancellation_notice_initial: Optional[int] = Field(
-        description="Number of days required to cancel the contract (INITIAL TERM)", default=None)
-    cancellation_notice_ongoing: Optional[int] = Field(
-        description="Number of days required to cancel the contract (ONGOING)", default=None)
-    payment_terms: Optional[str] = Field(description="Terms (monthly, yearly, user subscription, per licence, other)",
-                                         default=None)
-    payment_delay: Optional[int] = Field(description="Delay between invoice receiption and payment (in days)",
-                                         default=0)
-    payment_amount_setup: Optional[float] = Field(description="Payment amount, setup fee", default=None)
-    payment_amount_per_terms: Optional[float] = Field(
-        description="Payment amount per terms (per user, per month, per licence)", default=None)
-    sla_uptime_guarantee: Optional[str] = Field(description="Any included SLA/Uptime guarantee terms", default=None)
-    integration_clauses: Optional[str] = Field(description="Compatibility with DMS/CRM", default=None)
-    data_ownership: str = Field(description="Who owns stored data, assume DEALER if not specified", default="DEALER")
-    license_count: int = Field(
-        description="Number of licenses, active users, seats. If not presented assume unlimited (mark as -1)",
-        default=-1)
+        with self._lock:
+            embeddings = list(self._embeddings)
+            fingerprints = list(self._fingerprints)
+            blobs = list(self._blobs)
+
+        if embeddings:
+            scores = np.stack(embeddings) @ embedding
+            # Only consider entries with the same vendor(s), dates and amounts
+            for index in np.argsort(scores)[::-1]:
+                if scores[index] <= self.threshold:
+                    break
+                if fingerprints[index] == fingerprint:
+                    logger.info(f"Semantic cache hit (similarity {scores[index]:.3f})")
+                    return decode_contract(blobs[index]), None
+
+        return None, (embedding, fingerprint)
+
+    def add(self, state: tuple, result: SoftwareContract) -> None:
+        """
+        Store an extracted contract in the semantic cache.
+
+        Args:
+            state: Lookup state returned by ``lookup``
+            result: Extracted contract data
+        """
+        if state is None:
+            return
+
+        embedding, fingerprint = state
+        blob = result.model_dump_json()
+        with self._lock:
+            self._embeddings.append(embedding)
+            self._fingerprints.append(fingerprint)
+            self._blobs.append(blob)
 
 
 class ContractExtractor:
     """Service for extracting software contract information from PDFs."""
 
-    def __init__(self, api_key: str, few_shot_examples_path: str = None):
+    def __init__(self, api_key: str, few_shot_examples_path: Optional[str] = None, cache_dir: Optional[str] = None,
+                 semantic_cache_threshold: Optional[float] = None):
         """
         Initialize contract extractor with Google API key.
 
         Args:
             api_key: Google Gemini API key
             few_shot_examples_path: Path to few-shot examples JSON file
+            cache_dir: Directory for cached extraction results (in-memory only if None)
+            semantic_cache_threshold: Cosine similarity above which near-duplicate contracts
+                are served from the semantic cache (disabled if None)
         """
         self.client = genai.Client(api_key=api_key)
         self.few_shot_examples_path = few_shot_examples_path
-
-        self.system_prompt = """
-        You are an AI assistant specialized in extracting specific information from software contracts.
-        Extract EXACTLY these fields from the contract. Pay close attention to the exact field names and data types.
-
-        1. Software/System Name: The name of the product or service
-        2. Vendor Name (DBA): Company name doing business as
-        3. Vendor Name (Legal Entity): Legal entity name of the company
-        4. Contract Start: Start date of the contract (format: YYYY-MM-DD)
-        5. Contract End: End date of the contract (can be NULL if not specified)
-        6. Contract Period: Duration in months (integer)
-        7. Auto-renewal: Is the contract automatically renewed? (boolean: true/false)
-        8. Cancellation Notice (Initial Term): Days required to cancel during initial term (integer)
-        9. Cancellation Notice (Ongoing): Days required to cancel after initial term (integer)
-        10. Payment Terms: Monthly, yearly, per user subscription, per license, or other
-        11. Payment Amount Setup Fee: One-time setup fee amount (float)
-        12. Payment Amount Per Terms: Recurring payment amount (float)
-        13. SLA/Uptime Guarantee: Any service level agreement terms (can be NULL)
-        14. Integration Clauses: Compatibility with DMS/CRM systems
-        15. Data Ownership: Who owns the data (default to "DEALER" if not specified)
-        16. License Count: Number of licenses/users/seats (use -1 for unlimited)
-
-        IMPORTANT:
-        - Use NULL for missing string values
-        - Use null for missing date values
-        - Use appropriate data types (string, integer, float, boolean)
-        - For License Count, if unlimited or not specified, use -1
-        - For Data Ownership, if not specified, default to "DEALER"
-        - Extract dates in YYYY-MM-DD format
-        - For payment amounts, extract numeric values only (no currency symbols)
-        """
-
-        self.main_prompt = "Please extract the contract information from the attached PDF document according to the specified fields."
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # LRU of serialized contracts, shared by every thread using this extractor
+        self._response_cache: OrderedDict[str, str] = OrderedDict()
+        self._response_cache_lock = threading.Lock()
+        self.semantic_cache = SemanticCache(semantic_cache_threshold) if semantic_cache_threshold is not None else None
+
+        self.system_prompt = SYSTEM_PROMPT
+        self.main_prompt = MAIN_PROMPT
+
+        # Gemini Files API uploads: (path, mtime) of example PDFs or SHA-256 of user PDFs -> (uri, expiry)
+        self._uploaded_files: Dict[Any, tuple] = {}
+        # One [lock, users] entry per upload key in use, so a file is uploaded once even when
+        # requests race; entries are dropped when their last user is done
+        self._upload_locks: Dict[Any, List[Any]] = {}
+        # Guards _uploaded_files and _upload_locks
+        self._upload_locks_lock = threading.Lock()
+        # Guards the few-shot examples and context cache, which requests share across threads
+        self._context_lock = threading.RLock()
+        self._few_shot_examples: Optional[List[Any]] = None
+        self._few_shot_sources: List[Path] = []
+        self._few_shot_mtimes: Optional[tuple] = None
+        self._few_shot_expires_at = float("inf")
+        if not self.few_shot_examples_path:
+            # Nothing to load or watch, so _get_few_shot_examples never rebuilds
+            self._few_shot_examples = []
+            self._few_shot_mtimes = ()
+
+        self._cache_name: Optional[str] = None
+        self._cache_refresh_at = 0.0
+        self._refresh_context_cache()
 
     def create_few_shot_examples(self) -> List[Any]:
         """
@@ -95,7 +409,14 @@ class ContractExtractor:
         Returns:
             List of example prompts and responses
         """
-        if not self.few_shot_examples_path or not os.path.exists(self.few_shot_examples_path):
+        if not self.few_shot_examples_path:
+            self._few_shot_sources = []
+            return []
+
+        # Files the examples are built from, watched for changes by _get_few_shot_examples
+        self._few_shot_sources = [Path(self.few_shot_examples_path)]
+
+        if not os.path.exists(self.few_shot_examples_path):
             return []
 
         # Note: The original few-shot examples were for vehicle titles, not software contracts
@@ -114,6 +435,7 @@ class ContractExtractor:
                     continue
 
                 filepath = Path(example["pdf_path"])
+                self._few_shot_sources.append(filepath)
                 if not filepath.exists():
                     logger.warning(f"Example PDF file not found: {example['pdf_path']}")
                     continue
@@ -124,10 +446,7 @@ class ContractExtractor:
                 few_shot_examples.extend(
                     [
                         "Please extract the contract information from the following PDF",
-                        types.Part.from_bytes(
-                            data=filepath.read_bytes(),
-                            mime_type="application/pdf",
-                        ),
+                        self._get_example_part(filepath),
                         json.dumps(model_output, indent=2),
                     ],
                 )
@@ -136,6 +455,362 @@ class ContractExtractor:
 
         return few_shot_examples
 
+    def _get_example_part(self, filepath: Path) -> types.Part:
+        """
+        Reference an example PDF by its Gemini Files API URI, uploading it once
+        per (path, mtime) instead of inlining its bytes in every request.
+
+        Args:
+            filepath: Path to the example PDF
+
+        Returns:
+            Part referencing the uploaded file
+        """
+        key = (filepath.resolve(), filepath.stat().st_mtime)
+        try:
+            uploaded = self._get_upload(
+                key, lambda: self.client.files.upload(file=filepath, config={"mime_type": "application/pdf"})
+            )
+        except Exception as e:
+            logger.warning(f"Could not upload example PDF {filepath}, sending it inline: {str(e)}")
+            return types.Part.from_bytes(
+                data=filepath.read_bytes(),
+                mime_type="application/pdf",
+            )
+
+        # Rebuild the examples before any referenced upload expires
+        self._few_shot_expires_at = min(self._few_shot_expires_at, uploaded[1])
+        return types.Part.from_uri(file_uri=uploaded[0], mime_type="application/pdf")
+
+    def _get_upload(self, key: Any, upload: Callable[[], types.File]) -> tuple:
+        """
+        Return a Gemini Files API upload, uploading it if it is missing or about to expire.
+
+        Args:
+            key: Key of the upload in ``_uploaded_files``
+            upload: Function that uploads the file
+
+        Returns:
+            Tuple of (file URI, expiry time)
+        """
+        with self._upload_locks_lock:
+            # Forget uploads Gemini has deleted, so the dict doesn't grow for the life of the process
+            now = time.monotonic()
+            for expired in [k for k, (_, expires_at) in self._uploaded_files.items() if now > expires_at]:
+                del self._uploaded_files[expired]
+
+            entry = self._upload_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+
+        try:
+            with entry[0]:
+                with self._upload_locks_lock:
+                    uploaded = self._uploaded_files.get(key)
+                if uploaded is None or time.monotonic() > uploaded[1]:
+                    file = upload()
+                    uploaded = (file.uri, time.monotonic() + UPLOADED_FILE_TTL)
+                    with self._upload_locks_lock:
+                        self._uploaded_files[key] = uploaded
+                return uploaded
+        finally:
+            with self._upload_locks_lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._upload_locks[key]
+
+    def _get_mtimes(self) -> tuple:
+        """Return (path, mtime) pairs for the files the few-shot examples were built from."""
+        mtimes: List[tuple] = []
+        for path in self._few_shot_sources:
+            try:
+                mtimes.append((path, path.stat().st_mtime))
+            except OSError:
+                mtimes.append((path, None))
+        return tuple(mtimes)
+
+    def _get_few_shot_examples(self) -> List[Any]:
+        """
+        Return the few-shot examples, rebuilding them only if the examples JSON
+        or any example PDF changed on disk since they were last built, or an
+        uploaded example PDF is about to expire.
+
+        Returns:
+            List of example prompts and responses
+        """
+        with self._context_lock:
+            if (
+                self._few_shot_examples is not None
+                and time.monotonic() < self._few_shot_expires_at
+                and self._get_mtimes() == self._few_shot_mtimes
+            ):
+                return self._few_shot_examples
+
+            self._few_shot_expires_at = float("inf")
+            self._few_shot_examples = self.create_few_shot_examples()
+            self._few_shot_mtimes = self._get_mtimes()
+            # The context cache holds a copy of the old examples
+            self._cache_refresh_at = 0.0
+            return self._few_shot_examples
+
+    def _refresh_context_cache(self) -> Optional[str]:
+        """
+        Create (or re-create after TTL expiry) the Gemini context cache holding the
+        static system prompt and few-shot examples.
+
+        Returns:
+            Name of the cached content, or None if context caching is unavailable
+        """
+        with self._context_lock:
+            few_shot_examples = self._get_few_shot_examples()
+
+            if time.monotonic() < self._cache_refresh_at:
+                return self._cache_name
+
+            try:
+                cache = self.client.caches.create(
+                    model=MODEL,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=self.system_prompt,
+                        contents=few_shot_examples or None,
+                        ttl=f"{CONTEXT_CACHE_TTL}s",
+                    ),
+                )
+            except Exception as e:
+                self._cache_name = None
+                if isinstance(e, errors.ClientError) and e.code != 429:
+                    # e.g. the prompt is below the model's minimum cacheable token count
+                    logger.info(f"Context caching unavailable, sending prompt inline: {str(e)}")
+                    self._cache_refresh_at = float("inf")
+                else:
+                    # Rate limiting, server or network errors: try again later, not on every request
+                    logger.warning(f"Could not create context cache, sending prompt inline: {str(e)}")
+                    self._cache_refresh_at = time.monotonic() + CONTEXT_CACHE_RETRY_DELAY
+                return None
+
+            # The replaced cache is left to expire on its own: requests built with its
+            # name may still be in flight or waiting to retry
+            self._cache_name = cache.name
+            # Refresh a minute early so a request never references an expired cache
+            self._cache_refresh_at = time.monotonic() + CONTEXT_CACHE_TTL - 60
+            return self._cache_name
+
+    def _get_pdf_part(self, pdf_data: bytes) -> types.Part:
+        """
+        Build the request part for a PDF, uploading it through the Gemini Files API
+        (once per content hash) if it is larger than INLINE_PDF_LIMIT.
+
+        Args:
+            pdf_data: PDF file data as bytes
+
+        Returns:
+            Part holding or referencing the PDF
+        """
+        if len(pdf_data) <= INLINE_PDF_LIMIT:
+            return types.Part.from_bytes(
+                data=pdf_data,
+                mime_type="application/pdf",
+            )
+
+        key = hashlib.sha256(pdf_data).hexdigest()
+        try:
+            uploaded = self._get_upload(
+                key,
+                lambda: self.client.files.upload(file=io.BytesIO(pdf_data), config={"mime_type": "application/pdf"}),
+            )
+        except Exception as e:
+            logger.warning(f"Could not upload PDF, sending it inline: {str(e)}")
+            return types.Part.from_bytes(
+                data=pdf_data,
+                mime_type="application/pdf",
+            )
+
+        return types.Part.from_uri(file_uri=uploaded[0], mime_type="application/pdf")
+
+    def _build_request(self, pdf_data: bytes) -> tuple:
+        """
+        Build the contents and config for a generate_content call.
+
+        Args:
+            pdf_data: PDF file data as bytes
+
+        Returns:
+            Tuple of (contents, config)
+        """
+        config = GENERATION_CONFIG
+        pdf_part = self._get_pdf_part(pdf_data)
+
+        cache_name = self._refresh_context_cache()
+        if cache_name:
+            # System prompt and few-shot examples are already stored server-side
+            return [pdf_part, self.main_prompt], {**config, "cached_content": cache_name}
+
+        contents = [
+            self.system_prompt,
+            *self._get_few_shot_examples(),
+            pdf_part,
+            self.main_prompt,
+        ]
+        return contents, config
+
+    def _cache_key(self, pdf_data: bytes) -> str:
+        """Build the response cache key from the PDF contents, model and prompt version."""
+        return f"{hashlib.sha256(pdf_data).hexdigest()}:{MODEL}:{PROMPT_VERSION}"
+
+    def _cache_path(self, key: str) -> Path:
+        assert self.cache_dir is not None
+        # ':' is not allowed in file names on every platform
+        return self.cache_dir / f"{key.replace(':', '_').replace('/', '_')}.json"
+
+    def _get_cached(self, key: str) -> Optional[SoftwareContract]:
+        """
+        Look up a previously extracted contract.
+
+        Args:
+            key: Response cache key
+
+        Returns:
+            Cached SoftwareContract or None on a miss
+        """
+        with self._response_cache_lock:
+            blob = self._response_cache.get(key)
+            if blob is not None:
+                self._response_cache.move_to_end(key)
+        if blob is None and self.cache_dir:
+            cache_path = self._cache_path(key)
+            if cache_path.exists():
+                try:
+                    blob = cache_path.read_text()
+                except OSError as e:
+                    logger.warning(f"Could not read cached contract data: {str(e)}")
+                else:
+                    self._remember_response(key, blob)
+
+        if blob is None:
+            return None
+
+        try:
+            return decode_contract(blob)
+        except (msgspec.DecodeError, msgspec.ValidationError) as e:
+            # Truncated or from an older schema: drop it and extract again
+            logger.warning(f"Discarding unreadable cached contract data: {str(e)}")
+            with self._response_cache_lock:
+                self._response_cache.pop(key, None)
+            if self.cache_dir:
+                self._cache_path(key).unlink(missing_ok=True)
+            return None
+
+    def _remember_response(self, key: str, blob: str) -> None:
+        """
+        Keep a serialized contract in memory, evicting the least recently used one when full.
+
+        Args:
+            key: Response cache key
+            blob: Contract data as JSON
+        """
+        with self._response_cache_lock:
+            self._response_cache[key] = blob
+            self._response_cache.move_to_end(key)
+            while len(self._response_cache) > RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+
+    def _set_cached(self, key: str, result: SoftwareContract) -> None:
+        """
+        Store an extracted contract in the response cache.
+
+        Args:
+            key: Response cache key
+            result: Extracted contract data
+        """
+        blob = result.model_dump_json()
+        self._remember_response(key, blob)
+        if self.cache_dir:
+            cache_path = self._cache_path(key)
+            # Write to a unique temp file and rename it into place, so readers never see a partial file
+            temp_path = cache_path.with_name(f"{cache_path.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                temp_path.write_text(blob)
+                os.replace(temp_path, cache_path)
+            except OSError as e:
+                logger.warning(f"Could not write cached contract data: {str(e)}")
+                temp_path.unlink(missing_ok=True)
+
+    def _lookup(self, pdf_data: bytes) -> tuple:
+        """
+        Look up the PDF in the response and semantic caches.
+
+        Args:
+            pdf_data: PDF file data as bytes
+
+        Returns:
+            Tuple of (cache key, cached SoftwareContract or None, semantic cache state)
+        """
+        key = self._cache_key(pdf_data)
+        cached = self._get_cached(key)
+        if cached is not None:
+            logger.info("Returning cached contract data")
+            return key, cached, None
+
+        semantic_state = None
+        if self.semantic_cache:
+            cached, semantic_state = self.semantic_cache.lookup(pdf_data)
+
+        return key, cached, semantic_state
+
+    def _handle_response(self, response, key: str, semantic_state) -> SoftwareContract:
+        """
+        Parse a Gemini response and store the result in the caches.
+
+        Args:
+            response: Gemini generate_content response
+            key: Response cache key
+            semantic_state: Semantic cache state returned by ``_lookup``
+
+        Returns:
+            SoftwareContract object containing extracted contract information
+        """
+        # Parse the JSON response. The schema was already enforced server-side via
+        # response_schema, so only msgspec's type check runs here. The SDK json.loads
+        # the text for any response_schema; reuse that instead of parsing it again.
+        if isinstance(response.parsed, dict):
+            result = decode_contract(response.parsed)
+        elif response.text:
+            result = decode_contract(response.text)
+        else:
+            # e.g. the prompt or the response was blocked by safety filters
+            feedback = response.prompt_feedback
+            if feedback and feedback.block_reason:
+                reason = f"prompt blocked ({feedback.block_reason})"
+            elif response.candidates:
+                reason = f"finish reason {response.candidates[0].finish_reason}"
+            else:
+                reason = "no candidates returned"
+            raise ValueError(f"Gemini returned no contract data: {reason}")
+
+        self._set_cached(key, result)
+        if self.semantic_cache:
+            self.semantic_cache.add(semantic_state, result)
+        return result
+
+    @gemini_retry
+    def _generate_content(self, contents: List[Any],
+                          config: types.GenerateContentConfigDict) -> types.GenerateContentResponse:
+        """Call Gemini, retrying rate-limited and transient server errors."""
+        return self.client.models.generate_content(
+            model=MODEL,
+            contents=contents,
+            config=config,
+        )
+
+    @gemini_retry
+    async def _generate_content_async(self, contents: List[Any],
+                                      config: types.GenerateContentConfigDict) -> types.GenerateContentResponse:
+        """Call Gemini asynchronously, retrying rate-limited and transient server errors."""
+        return await self.client.aio.models.generate_content(
+            model=MODEL,
+            contents=contents,
+            config=config,
+        )
+
     def extract_data_from_pdf(self, pdf_data: bytes) -> SoftwareContract:
         """
         Extract contract data from PDF data.
@@ -149,31 +824,73 @@ class ContractExtractor:
         Raises:
             Exception: If extraction fails
         """
+        key, cached, semantic_state = self._lookup(pdf_data)
+        if cached is not None:
+            return cached
+
         try:
-            few_shot_examples = self.create_few_shot_examples()
-
-            response = self.client.models.generate_content(
-                model="models/gemini-2.0-flash",
-                contents=[
-                    self.system_prompt,
-                    *few_shot_examples,
-                    types.Part.from_bytes(
-                        data=pdf_data,
-                        mime_type="application/pdf",
-                    ),
-                    self.main_prompt,
-                ],
-                config={"response_mime_type": "application/json", "response_schema": SoftwareContract},
-            )
+            contents, config = self._build_request(pdf_data)
+
+            response = self._generate_content(contents, config)
 
-            # Parse the JSON response
-            result = response.parsed
-            return result
+            return self._handle_response(response, key, semantic_state)
 
         except Exception as e:
             logger.error(f"Error extracting contract data from PDF: {str(e)}")
             raise
 
+    async def extract_data_from_pdf_async(self, pdf_data: bytes) -> SoftwareContract:
+        """
+        Extract contract data from PDF data without blocking the event loop
+        during the Gemini call.
+
+        Args:
+            pdf_data: PDF file data as bytes
+
+        Returns:
+            SoftwareContract object containing extracted contract information
+
+        Raises:
+            Exception: If extraction fails
+        """
+        # Hashing, disk reads and the semantic cache's PDF parsing and embedding are blocking
+        key, cached, semantic_state = await asyncio.to_thread(self._lookup, pdf_data)
+        if cached is not None:
+            return cached
+
+        try:
+            # Uploading a large PDF or refreshing the context cache are blocking calls
+            contents, config = await asyncio.to_thread(self._build_request, pdf_data)
+
+            response = await self._generate_content_async(contents, config)
+
+            # Decoding and the cache writes (disk and semantic cache) are blocking too
+            return await asyncio.to_thread(self._handle_response, response, key, semantic_state)
+
+        except Exception as e:
+            logger.error(f"Error extracting contract data from PDF: {str(e)}")
+            raise
+
+    async def extract_many(self, pdf_datas: List[bytes], concurrency: int = 8) -> List[Any]:
+        """
+        Extract contract data from several PDFs concurrently.
+
+        Args:
+            pdf_datas: List of PDF file data as bytes
+            concurrency: Maximum number of Gemini requests in flight at once
+
+        Returns:
+            List with a SoftwareContract, or the exception raised while extracting it, per PDF
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(pdf_data: bytes) -> SoftwareContract:
+            async with semaphore:
+                return await self.extract_data_from_pdf_async(pdf_data)
+
+        # One failed PDF should not discard the results of the others
+        return await asyncio.gather(*[bounded(pdf_data) for pdf_data in pdf_datas], return_exceptions=True)
+
     def extract_data_from_file(self, pdf_file_path: str) -> SoftwareContract:
         """
         Extract contract data from a PDF file.
@@ -199,13 +916,5 @@ class ContractExtractor:
         Returns:
             SoftwareContract object containing extracted contract information
         """
-        # For Streamlit uploaded files, save to temp file first
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-            temp_file.write(uploaded_file.getvalue())
-            temp_file_path = temp_file.name
-
-        try:
-            return self.extract_data_from_file(temp_file_path)
-        finally:
-            # Clean up the temp file
-            os.unlink(temp_file_path)
\ No newline at end of file
+        # The upload is already in memory, no need to round-trip it through a temp file
+        return self.extract_data_from_pdf(uploaded_file.getvalue())
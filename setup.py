@@ -0,0 +1,18 @@
+"""
+Optional native build of processor.py with mypyc.
+
+    pip install mypy
+    python setup.py build_ext --inplace
+
+This places a compiled processor extension next to processor.py, which Python
+imports in preference to the source. Delete the .so/.pyd to go back to the
+pure Python module.
+"""
+from setuptools import setup
+from mypyc.build import mypycify
+
+setup(
+    name="contract-extractor",
+    py_modules=["processor", "models"],
+    ext_modules=mypycify(["processor.py"]),
+)
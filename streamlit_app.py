@@ -1,7 +1,16 @@
 import streamlit as st
-import base64
-import pandas as pd
-import json
+import asyncio
+import atexit
+import csv
+import hashlib
+import html
+import io
+import orjson
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
 from processor import ContractExtractor, SoftwareContract
 
 # Set the page title and configure the layout
@@ -10,22 +19,105 @@ st.set_page_config(
     layout="wide"
 )
 
+# Custom CSS for better table styling
+CONTRACT_TABLE_CSS = """
+<style>
+.contract-table {
+    width: 100%;
+    border-collapse: collapse;
+}
+.contract-table th {
+    background-color: #f0f2f6;
+    padding: 12px;
+    text-align: left;
+    font-weight: bold;
+    border-bottom: 2px solid #ddd;
+}
+.contract-table td {
+    padding: 12px;
+    border-bottom: 1px solid #ddd;
+}
+.contract-table tr:hover {
+    background-color: #f5f5f5;
+}
+</style>
+"""
+
+st.markdown(CONTRACT_TABLE_CSS, unsafe_allow_html=True)
+
 # Display the application title
 st.title("Software Contract Data Extractor")
 
+# Uploaded PDFs are written here and served by Streamlit's static file serving
+# (server.enableStaticServing in .streamlit/config.toml)
+STATIC_DIR = Path(__file__).parent / "static"
+
+# Served PDFs not viewed for this long are deleted from STATIC_DIR, checked every
+# STATIC_PDF_PRUNE_INTERVAL seconds whether or not anyone is using the app
+STATIC_PDF_TTL = 3600
+STATIC_PDF_PRUNE_INTERVAL = 300
+
+
+def prune_static_pdfs(max_age: float = STATIC_PDF_TTL) -> None:
+    """Delete served PDFs that no session has viewed within max_age seconds."""
+    cutoff = time.time() - max_age
+    for pdf_path in STATIC_DIR.glob("*.pdf"):
+        try:
+            if pdf_path.stat().st_mtime <= cutoff:
+                pdf_path.unlink()
+        except OSError:
+            # Already pruned by another thread
+            pass
+
+
+@st.cache_resource
+def start_static_pdf_pruner() -> threading.Thread:
+    """Prune served PDFs now and periodically in the background, and delete them all on shutdown."""
+    def prune_forever():
+        while True:
+            prune_static_pdfs()
+            time.sleep(STATIC_PDF_PRUNE_INTERVAL)
+
+    atexit.register(prune_static_pdfs, max_age=0)
+    thread = threading.Thread(target=prune_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+start_static_pdf_pruner()
+
+
+def get_pdf_url(pdf_bytes: bytes) -> str:
+    """Save the PDF under an unguessable per-session name in STATIC_DIR and return its URL."""
+    served_pdfs = st.session_state.setdefault("served_pdfs", {})
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    file_name = served_pdfs.setdefault(digest, f"{uuid.uuid4().hex}.pdf")
+
+    STATIC_DIR.mkdir(exist_ok=True)
+    pdf_path = STATIC_DIR / file_name
+    if pdf_path.exists():
+        # Keep the file alive while the session is still viewing it
+        pdf_path.touch()
+    else:
+        pdf_path.write_bytes(pdf_bytes)
+
+    base_url_path = st.get_option("server.baseUrlPath").strip("/")
+    return f"/{base_url_path}/app/static/{file_name}" if base_url_path else f"/app/static/{file_name}"
 
-def display_pdf(file):
+
+def display_pdf(file, key: str = "pdf"):
     """Display a PDF using Mozilla's PDF.js viewer."""
     pdf_bytes = file.getvalue()
 
     st.download_button(
         label="📥 Download PDF",
         data=pdf_bytes,
-        file_name="contract.pdf",
-        mime="application/pdf"
+        file_name=file.name,
+        mime="application/pdf",
+        key=f"{key}_download"
     )
 
-    base64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
+    pdf_url = get_pdf_url(pdf_bytes)
 
     pdf_js_html = f"""
     <!DOCTYPE html>
@@ -53,34 +145,45 @@ def display_pdf(file):
             import * as pdfjsLib from 'https://cdnjs.cloudflare.com/ajax/libs/pdf.js/5.0.375/pdf.min.mjs';
             pdfjsLib.GlobalWorkerOptions.workerSrc = 'https://cdnjs.cloudflare.com/ajax/libs/pdf.js/5.0.375/pdf.worker.min.mjs';
 
-            const pdfData = atob('{base64_pdf}');
-            const pdfBytes = new Uint8Array(pdfData.length);
-            for (let i = 0; i < pdfData.length; i++) {{
-                pdfBytes[i] = pdfData.charCodeAt(i);
-            }}
-
-            const loadingTask = pdfjsLib.getDocument({{ data: pdfBytes }});
-            loadingTask.promise.then(function(pdf) {{
+            // Let the browser fetch the PDF instead of inlining it as base64
+            // Fetch the whole file up front, so pages still render if it is pruned while open
+            const loadingTask = pdfjsLib.getDocument({{ url: '{pdf_url}', disableRange: true, disableStream: true }});
+            loadingTask.promise.then(async function(pdf) {{
                 const container = document.getElementById('pdf-container');
-
-                for (let pageNum = 1; pageNum <= pdf.numPages; pageNum++) {{
-                    pdf.getPage(pageNum).then(function(page) {{
-                        const scale = 1.5;
-                        const viewport = page.getViewport({{scale: scale}});
-
-                        const canvas = document.createElement('canvas');
-                        canvas.className = 'pdf-page-canvas';
-                        canvas.width = viewport.width;
-                        canvas.height = viewport.height;
-                        container.appendChild(canvas);
-
-                        const context = canvas.getContext('2d');
+                const scale = 1.5;
+                const pages = new Map();
+
+                // Render a page only once it scrolls into view
+                const observer = new IntersectionObserver(function(entries) {{
+                    entries.forEach(function(entry) {{
+                        if (!entry.isIntersecting) {{
+                            return;
+                        }}
+                        const canvas = entry.target;
+                        observer.unobserve(canvas);
+
+                        const page = pages.get(canvas);
                         const renderContext = {{
-                            canvasContext: context,
-                            viewport: viewport
+                            canvasContext: canvas.getContext('2d'),
+                            viewport: page.getViewport({{scale: scale}})
                         }};
                         page.render(renderContext);
                     }});
+                }}, {{ root: container, rootMargin: '200px 0px' }});
+
+                // Lay out placeholder canvases sized to each page
+                for (let pageNum = 1; pageNum <= pdf.numPages; pageNum++) {{
+                    const page = await pdf.getPage(pageNum);
+                    const viewport = page.getViewport({{scale: scale}});
+
+                    const canvas = document.createElement('canvas');
+                    canvas.className = 'pdf-page-canvas';
+                    canvas.width = viewport.width;
+                    canvas.height = viewport.height;
+                    container.appendChild(canvas);
+
+                    pages.set(canvas, page);
+                    observer.observe(canvas);
                 }}
             }}).catch(function(error) {{
                 document.getElementById('pdf-container').innerHTML = 
@@ -94,43 +197,81 @@ def display_pdf(file):
     st.components.v1.html(pdf_js_html, height=800)
 
 
-def display_contract_data(contract_data: SoftwareContract):
+@st.cache_resource
+def get_extractor(api_key: str, few_shot_examples_path: Optional[str], cache_dir: Optional[str],
+                  semantic_cache_threshold: Optional[float]) -> ContractExtractor:
+    """Create the ContractExtractor once, so its caches survive reruns and are shared across sessions."""
+    return ContractExtractor(
+        api_key=api_key,
+        few_shot_examples_path=few_shot_examples_path,
+        cache_dir=cache_dir,
+        semantic_cache_threshold=semantic_cache_threshold,
+    )
+
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Start the event loop extractions run on.
+
+    The cached extractor's async Gemini client must stay on one loop, so a
+    single loop runs forever in a background thread instead of asyncio.run
+    creating a new one per rerun.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+def run_async(coro):
+    """Run a coroutine on the shared event loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+
+# (label, SoftwareContract attribute, formatter, value shown when the attribute is None or "")
+FIELD_SPECS = (
+    ("Software/System Name", "software_system_name", str, "NULL"),
+    ("Vendor Name (DOING BUSINESS AS)", "vendor_name_dba", str, "NULL"),
+    ("Vendor Name (LEGAL ENTITY)", "vendor_name_legal", str, "NULL"),
+    ("Contract Start", "contract_start", str, "NULL"),
+    ("Contract End", "contract_end", str, "NULL"),
+    ("Contract Period", "contract_period", lambda v: f"{v} months", "NULL"),
+    ("Auto-renewal", "auto_renewal", lambda v: "TRUE" if v else "FALSE", "NULL"),
+    ("Cancellation Notice (INITIAL TERM, DAYS)", "cancellation_notice_initial", str, "NULL"),
+    ("Cancellation Notice (ONGOING, DAYS)", "cancellation_notice_ongoing", str, "NULL"),
+    ("Payment Terms", "payment_terms", str, "NULL"),
+    ("Payment Delay", "payment_delay", str, "0"),
+    ("Payment amount, setup fee", "payment_amount_setup", lambda v: f"${v:.2f}", "NULL"),
+    ("Payment amount per terms", "payment_amount_per_terms", lambda v: f"${v:.2f}", "NULL"),
+    ("SLA/Uptime Guarantee", "sla_uptime_guarantee", str, "NULL"),
+    ("Integration Clauses", "integration_clauses", str, "NULL"),
+    ("Data Ownership", "data_ownership", str, "DEALER"),
+    ("License Count", "license_count", lambda v: "Unlimited" if v == -1 else str(v), "Unlimited"),
+)
+
+
+def display_contract_data(contract_data: SoftwareContract, key: str = "contract"):
     """Display the extracted contract data in a table format"""
     with st.container():
         st.subheader("Extracted Contract Information")
 
         # Create a dictionary with proper field mappings
         data_dict = {
-            "Software/System Name": contract_data.software_system_name or "NULL",
-            "Vendor Name (DOING BUSINESS AS)": contract_data.vendor_name_dba or "NULL",
-            "Vendor Name (LEGAL ENTITY)": contract_data.vendor_name_legal or "NULL",
-            "Contract Start": contract_data.contract_start if contract_data.contract_start else "NULL",
-            "Contract End": contract_data.contract_end if contract_data.contract_end else "NULL",
-            "Contract Period": f"{contract_data.contract_period} months" if contract_data.contract_period is not None else "NULL",
-            "Auto-renewal": "TRUE" if contract_data.auto_renewal is True else "FALSE" if contract_data.auto_renewal is False else "NULL",
-            "Cancellation Notice (INITIAL TERM, DAYS)": str(
-                contract_data.cancellation_notice_initial) if contract_data.cancellation_notice_initial is not None else "NULL",
-            "Cancellation Notice (ONGOING, DAYS)": str(
-                contract_data.cancellation_notice_ongoing) if contract_data.cancellation_notice_ongoing is not None else "NULL",
-            "Payment Terms": contract_data.payment_terms if contract_data.payment_terms else "NULL",
-            "Payment Delay": contract_data.payment_delay if contract_data.payment_delay else "0",
-            "Payment amount, setup fee": f"${contract_data.payment_amount_setup:.2f}" if contract_data.payment_amount_setup is not None else "NULL",
-            "Payment amount per terms": f"${contract_data.payment_amount_per_terms:.2f}" if contract_data.payment_amount_per_terms is not None else "NULL",
-            "SLA/Uptime Guarantee": contract_data.sla_uptime_guarantee if contract_data.sla_uptime_guarantee else "NULL",
-            "Integration Clauses": contract_data.integration_clauses if contract_data.integration_clauses else "NULL",
-            "Data Ownership": contract_data.data_ownership or "DEALER",
-            "License Count": str(contract_data.license_count) if contract_data.license_count != -1 else "Unlimited",
+            label: fmt(value) if (value := getattr(contract_data, attr)) not in (None, "") else null_repr
+            for label, attr, fmt, null_repr in FIELD_SPECS
         }
 
         # Display as a table with proper alignment
         st.markdown("### Contract Details")
 
-        # Use a table for better alignment
-        df = pd.DataFrame(list(data_dict.items()), columns=['Field', 'Value'])
-
         # Display as HTML table with custom styling
+        rows = "".join(
+            f"<tr><td>{html.escape(field)}</td><td>{html.escape(str(value))}</td></tr>"
+            for field, value in data_dict.items()
+        )
         st.markdown(
-            df.to_html(index=False, escape=False, classes='contract-table'),
+            f"<table class='contract-table'><thead><tr><th>Field</th><th>Value</th></tr></thead>"
+            f"<tbody>{rows}</tbody></table>",
             unsafe_allow_html=True
         )
 
@@ -138,52 +279,34 @@ def display_contract_data(contract_data: SoftwareContract):
         st.markdown("### Export Options")
         col1, col2 = st.columns(2)
         with col1:
-            csv = df.to_csv(index=False)
+            csv_buffer = io.StringIO()
+            writer = csv.writer(csv_buffer)
+            writer.writerow(["Field", "Value"])
+            writer.writerows(data_dict.items())
             st.download_button(
                 label="📥 Download as CSV",
-                data=csv,
+                data=csv_buffer.getvalue(),
                 file_name="contract_data.csv",
-                mime="text/csv"
+                mime="text/csv",
+                key=f"{key}_csv"
             )
         with col2:
-            json_data = json.dumps(data_dict, indent=2)
+            json_data = orjson.dumps(data_dict, option=orjson.OPT_INDENT_2)
             st.download_button(
                 label="📥 Download as JSON",
                 data=json_data,
                 file_name="contract_data.json",
-                mime="application/json"
+                mime="application/json",
+                key=f"{key}_json"
             )
 
-        # Add custom CSS for better table styling
-        st.markdown("""
-        <style>
-        .contract-table {
-            width: 100%;
-            border-collapse: collapse;
-        }
-        .contract-table th {
-            background-color: #f0f2f6;
-            padding: 12px;
-            text-align: left;
-            font-weight: bold;
-            border-bottom: 2px solid #ddd;
-        }
-        .contract-table td {
-            padding: 12px;
-            border-bottom: 1px solid #ddd;
-        }
-        .contract-table tr:hover {
-            background-color: #f5f5f5;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-
 
 # Create a file uploader for PDF files
-uploaded_file = st.file_uploader("Upload or drag and drop a PDF contract file", type=["pdf"])
+uploaded_files = st.file_uploader("Upload or drag and drop PDF contract files", type=["pdf"],
+                                  accept_multiple_files=True)
 
-# Process the uploaded PDF file
-if uploaded_file is not None:
+# Process the uploaded PDF files
+if uploaded_files:
     # Initialize the ContractExtractor with Gemini API key from Streamlit secrets
     api_key = st.secrets["config"]["gemini_api_key"]
 
@@ -192,32 +315,58 @@ if uploaded_file is not None:
     if "config" in st.secrets and "few_shot_examples_path" in st.secrets["config"]:
         few_shot_examples_path = st.secrets["config"]["few_shot_examples_path"]
 
-    extractor = ContractExtractor(api_key=api_key, few_shot_examples_path=few_shot_examples_path)
-
-    # Display a spinner while processing
-    with st.spinner("Extracting contract data from PDF..."):
-        try:
-            # Extract contract data from the uploaded PDF
-            contract_data = extractor.extract_data_from_uploaded_file(uploaded_file)
+    # Get cache_dir if it exists, otherwise cache results in memory only
+    cache_dir = None
+    if "config" in st.secrets and "cache_dir" in st.secrets["config"]:
+        cache_dir = st.secrets["config"]["cache_dir"]
+
+    # Get semantic_cache_threshold if it exists, otherwise disable the semantic cache
+    semantic_cache_threshold = None
+    if "config" in st.secrets and "semantic_cache_threshold" in st.secrets["config"]:
+        semantic_cache_threshold = float(st.secrets["config"]["semantic_cache_threshold"])
+
+    extractor = get_extractor(
+        api_key=api_key,
+        few_shot_examples_path=few_shot_examples_path,
+        cache_dir=cache_dir,
+        semantic_cache_threshold=semantic_cache_threshold,
+    )
 
-            # Create two columns for side-by-side display
-            col1, col2 = st.columns(2)
+    # Display every PDF first, so the browser renders them while the extraction
+    # requests are in flight
+    placeholders = []
+    for index, uploaded_file in enumerate(uploaded_files):
+        if len(uploaded_files) > 1:
+            st.header(uploaded_file.name)
 
-            # Display PDF in the left column
-            with col1:
-                st.subheader("PDF Document")
-                display_pdf(uploaded_file)
+        # Create two columns for side-by-side display
+        col1, col2 = st.columns(2)
 
-            # Display extracted fields in the right column
-            with col2:
-                display_contract_data(contract_data)
+        # Display PDF in the left column
+        with col1:
+            st.subheader("PDF Document")
+            display_pdf(uploaded_file, key=f"pdf_{index}")
 
-        except Exception as e:
-            st.error(f"Error processing PDF: {str(e)}")
-            st.error("Please check the logs for more details.")
-            import traceback
+        # Reserve the right column for the extracted fields
+        with col2:
+            placeholders.append(st.empty())
 
-            st.code(traceback.format_exc())
+    # Display a spinner while processing
+    with st.spinner("Extracting contract data from PDF..."):
+        # Extract contract data from all uploaded PDFs concurrently
+        results = run_async(extractor.extract_many([uploaded_file.getvalue() for uploaded_file in uploaded_files]))
+
+    # Display extracted fields in the right columns
+    for index, (placeholder, result) in enumerate(zip(placeholders, results)):
+        with placeholder.container():
+            if isinstance(result, Exception):
+                st.error(f"Error processing PDF: {str(result)}")
+                st.error("Please check the logs for more details.")
+                import traceback
+
+                st.code("".join(traceback.format_exception(result)))
+            else:
+                display_contract_data(result, key=f"contract_{index}")
 else:
     # Display instructions when no file is uploaded
     st.info("Please upload a PDF contract file to extract contract information.")
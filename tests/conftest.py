@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Make the top-level modules importable when running pytest from any directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
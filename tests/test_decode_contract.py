@@ -0,0 +1,27 @@
+import msgspec
+import pytest
+
+from processor import decode_contract
+
+REQUIRED = '"software_system_name": "CRM", "vendor_name_dba": "Acme", "vendor_name_legal": "Acme Inc."'
+
+
+def test_decode_coerces_like_pydantic():
+    blob = f'{{{REQUIRED}, "contract_period": 12.0, "license_count": "5"}}'
+    # Both the raw response text and the dict the SDK parsed it into
+    for source in (blob, msgspec.json.decode(blob)):
+        contract = decode_contract(source)
+        assert contract.contract_period == 12
+        assert contract.license_count == 5
+
+
+def test_decode_fills_defaults():
+    contract = decode_contract(f"{{{REQUIRED}}}")
+    assert contract.data_ownership == "DEALER"
+    assert contract.license_count == -1
+    assert contract.payment_delay == 0
+
+
+def test_decode_rejects_missing_required_fields():
+    with pytest.raises(msgspec.ValidationError):
+        decode_contract('{"software_system_name": "CRM"}')
@@ -0,0 +1,66 @@
+import pytest
+
+from processor import SemanticCache, _parse_amount
+
+TEMPLATE = (
+    "Software Subscription Agreement between Acme Inc. and the Dealer.\n"
+    "The initial term is 36 months starting January 31, 2024.\n"
+    "Renews automatically for successive one-year terms.\n"
+    "Either party may cancel with 90 days written notice.\n"
+    "The subscription covers 25 seats.\n"
+    "Acme guarantees 99.9% uptime.\n"
+    "Fee 120.00 EUR per month, invoiced monthly, setup fee $924.00.\n"
+)
+
+
+@pytest.fixture
+def cache():
+    return SemanticCache()
+
+
+@pytest.mark.parametrize(
+    "amount, expected",
+    [
+        ("1,200.00", "1200"),
+        ("1 200,00", "1200"),
+        ("1.200,00", "1200"),
+        ("1200", "1200"),
+        ("120.00", "120"),
+        ("12000", "12000"),
+        ("924.00", "924"),
+        ("92,400", "92400"),
+        ("99.5", "99.5"),
+    ],
+)
+def test_parse_amount(amount, expected):
+    assert _parse_amount(amount) == expected
+
+
+def test_identical_terms_match(cache):
+    reformatted = TEMPLATE.replace("\n", "  \n").replace("Fee 120.00 EUR", "Fee  120.00 EUR")
+    assert cache._fingerprint(TEMPLATE) == cache._fingerprint(reformatted)
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        ("Fee 120.00 EUR", "Fee 12000 EUR"),
+        ("$924.00", "$92,400"),
+        ("90 days", "30 days"),
+        ("36 months", "12 months"),
+        ("25 seats", "200 seats"),
+        ("99.9%", "95%"),
+        ("Renews automatically", "Does not renew"),
+        ("January 31, 2024", "January 31, 2025"),
+        ("Acme Inc.", "Globex Inc."),
+    ],
+)
+def test_changed_terms_do_not_match(cache, old, new):
+    assert old in TEMPLATE
+    assert cache._fingerprint(TEMPLATE) != cache._fingerprint(TEMPLATE.replace(old, new))
+
+
+def test_swapped_numbers_do_not_match(cache):
+    text = "Initial notice 30 days.\nOngoing notice 90 days.\n"
+    swapped = "Initial notice 90 days.\nOngoing notice 30 days.\n"
+    assert cache._fingerprint(text) != cache._fingerprint(swapped)